@@ -0,0 +1,231 @@
+import asyncio
+import json
+import os
+import re
+import sys
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.clean_srt import parse_srt
+from utils.time import timestamp_to_seconds
+
+INSIGHTS_FILE = "chapter_insights.json"
+MAX_SECTION_CHARS = 6000  # keeps the prompt well inside llama3-8b's 8k context
+
+
+def build_insight_prompt(title: str, text: str) -> str:
+    """Prompt asking the LLM for a summary, key terms and a challenge for one section."""
+    return (
+        f"Below is the transcript of the section \"{title}\" from a Python programming video.\n"
+        f"\"\"\"\n{text}\n\"\"\"\n\n"
+        f"Respond with JSON only, using exactly these keys:\n"
+        f"- \"summary\": 1–2 sentences on what this section teaches\n"
+        f"- \"key_terms\": a list of up to 6 Python terms or concepts introduced\n"
+        f"- \"challenge\": a very short Python challenge for a beginner on the same concept, "
+        f"1–2 sentences of instructions, no code or explanation"
+    )
+
+
+def build_sections(chunks: List[Dict], chapters: List[Dict], window_seconds: int = 300) -> List[Dict]:
+    """Split transcript chunks into chapters, or fixed time windows if there are none."""
+    timed = [(timestamp_to_seconds(c["timestamp"]), c["text"]) for c in chunks]
+    if not timed:
+        return []
+    video_end = max(ts for ts, _ in timed) + 1
+
+    if chapters:
+        ordered = sorted(chapters, key=lambda c: c["seconds"])
+        bounds = [(c["seconds"], c["title"]) for c in ordered]
+        # Anything before the first chapter belongs to it
+        bounds[0] = (0, bounds[0][1])
+    else:
+        bounds = [(start, f"{start // 60}:{start % 60:02d}")
+                  for start in range(0, video_end, window_seconds)]
+
+    sections = []
+    for i, (start, title) in enumerate(bounds):
+        end = bounds[i + 1][0] if i + 1 < len(bounds) else video_end
+        text = " ".join(t for ts, t in timed if start <= ts < end)
+        if text:
+            sections.append({"title": title, "start": start, "end": end, "text": text})
+    return sections
+
+
+def parse_insight(content: str) -> Optional[Dict]:
+    """Pull the JSON object out of an LLM reply; None if it is missing or incomplete."""
+    match = re.search(r"\{.*\}", content, re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict) or not data.get("challenge"):
+        return None
+    key_terms = data.get("key_terms") or []
+    if isinstance(key_terms, str):
+        key_terms = [t.strip() for t in key_terms.split(",") if t.strip()]
+    return {
+        "summary": str(data.get("summary", "")).strip(),
+        "key_terms": [str(t).strip() for t in key_terms][:6],
+        "challenge": str(data["challenge"]).strip(),
+    }
+
+
+def load_insights(persist_dir: str) -> Dict[str, Dict]:
+    """Return the stored insights for a video, keyed by section start (as a string)."""
+    path = os.path.join(persist_dir, INSIGHTS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("sections", {})
+
+
+def save_insights(persist_dir: str, sections: Dict[str, Dict]):
+    os.makedirs(persist_dir, exist_ok=True)
+    path = os.path.join(persist_dir, INSIGHTS_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"sections": sections}, f, ensure_ascii=False, indent=2)
+    # Atomic swap so an interrupted run never leaves a half-written file
+    os.replace(tmp_path, path)
+
+
+def find_insight(insights: Dict[str, Dict], seconds: int) -> Optional[Dict]:
+    """Return the insight for the section containing `seconds`, if one was generated."""
+    if not insights:
+        return None
+    starts = sorted(int(s) for s in insights)
+    i = bisect_right(starts, seconds) - 1
+    if i < 0:
+        return None
+    insight = insights[str(starts[i])]
+    return insight if seconds < insight["end"] else None
+
+
+def _load_chapters(srt_path: str) -> List[Dict]:
+    from app.youtube_processor import extract_chapters  # lazy, like embed_transcript
+    video_id = os.path.basename(srt_path).split("_")[0]
+    return extract_chapters(video_id)
+
+
+def pending_sections(srt_path: str, persist_dir: str, chapters: List[Dict],
+                     window_seconds: int = 300) -> tuple:
+    """Return (all sections, stored insights, sections still to generate)."""
+    sections = build_sections(parse_srt(srt_path), chapters, window_seconds)
+    insights = load_insights(persist_dir)
+    todo = [s for s in sections if str(s["start"]) not in insights]
+    print(f"🧠 {len(sections) - len(todo)}/{len(sections)} sections already done, generating {len(todo)}.")
+    return sections, insights, todo
+
+
+def section_prompt(section: Dict) -> str:
+    return build_insight_prompt(section["title"], section["text"][:MAX_SECTION_CHARS])
+
+
+def record_insight(persist_dir: str, insights: Dict[str, Dict], section: Dict, insight: Optional[Dict]):
+    """Store one generated insight (saving right away so a re-run can resume)."""
+    if insight is None:
+        print(f"⚠️ {section['title']}: could not parse LLM reply, will retry on next run")
+        return
+    insights[str(section["start"])] = {
+        "title": section["title"],
+        "start": section["start"],
+        "end": section["end"],
+        **insight,
+    }
+    save_insights(persist_dir, insights)
+
+
+def precompute_chapter_insights(
+    srt_path: str,
+    persist_dir: str,
+    llm=None,
+    chapters: Optional[List[Dict]] = None,
+    window_seconds: int = 300,
+    max_workers: int = 4,
+) -> Dict[str, Dict]:
+    """Generate a summary, key terms and a challenge for every chapter of a video.
+
+    Results are saved next to the video's vectorstore after each section, so
+    an interrupted run picks up where it left off when called again.
+    """
+    if chapters is None:
+        chapters = _load_chapters(srt_path)
+    if llm is None:
+        from langchain_groq import ChatGroq
+        llm = ChatGroq(model="llama3-8b-8192", groq_api_key=os.getenv("GROQ_API_KEY"))
+
+    sections, insights, todo = pending_sections(srt_path, persist_dir, chapters, window_seconds)
+
+    def generate(section: Dict) -> Optional[Dict]:
+        return parse_insight(llm.invoke(section_prompt(section)).content)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {pool.submit(generate, s): s for s in todo}
+        for future in as_completed(futures):
+            section = futures[future]
+            try:
+                insight = future.result()
+            except Exception as e:
+                print(f"⚠️ {section['title']}: {e}")
+                continue
+            record_insight(persist_dir, insights, section, insight)
+
+    print(f"✅ Stored insights for {len(insights)}/{len(sections)} sections in: {persist_dir}")
+    return insights
+
+
+async def aprecompute_chapter_insights(
+    srt_path: str,
+    persist_dir: str,
+    llm,
+    limit: asyncio.Semaphore,
+    chapters: List[Dict],
+    window_seconds: int = 300,
+) -> Dict[str, Dict]:
+    """Async variant for callers that own the LLM client and its concurrency limit.
+
+    Every LLM call goes through `limit`, so the stage shares the caller's
+    bound instead of adding its own workers on top.
+    """
+    # File work runs off the event loop, like the rest of the service's disk I/O
+    sections, insights, todo = await asyncio.to_thread(
+        pending_sections, srt_path, persist_dir, chapters, window_seconds
+    )
+
+    async def generate(section: Dict) -> tuple:
+        async with limit:
+            try:
+                message = await llm.ainvoke(section_prompt(section))
+            except Exception as e:
+                print(f"⚠️ {section['title']}: {e}")
+                return section, None, False
+        return section, parse_insight(message.content), True
+
+    for next_done in asyncio.as_completed([generate(s) for s in todo]):
+        section, insight, ok = await next_done
+        if ok:
+            await asyncio.to_thread(record_insight, persist_dir, insights, section, insight)
+
+    print(f"✅ Stored insights for {len(insights)}/{len(sections)} sections in: {persist_dir}")
+    return insights
+
+
+if __name__ == "__main__":
+    # Usage: python app/chapter_insights.py <video_id> [max_workers]
+    from dotenv import load_dotenv
+    load_dotenv()
+    video_id = sys.argv[1]
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    from app.storage_manager import INGEST_LEASE_TTL, StorageManager
+    # Leased so background maintenance can't evict the store or drop our .tmp file mid-run
+    with StorageManager().lease(video_id, ttl=INGEST_LEASE_TTL):
+        precompute_chapter_insights(
+            f"data/{video_id}_captions.srt",
+            os.path.join("vectorstore", "youtube", video_id),
+            max_workers=workers,
+        )
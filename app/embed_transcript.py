@@ -9,6 +9,7 @@ from langchain_community.vectorstores import Chroma
 from langchain.schema import Document
 from utils.clean_srt import parse_srt
 from utils.time import timestamp_to_seconds
+from utils.chunk_index import ChunkIndex
 
 
 
@@ -26,7 +27,7 @@ def embed_transcript(srt_path: str, persist_dir: str = "vectorstore/youtube"):
     chapters_sorted = sorted(chapters, key=lambda c: c["seconds"])
 
     docs = []
-    for chunk in parsed_chunks:
+    for position, chunk in enumerate(parsed_chunks):
         ts = timestamp_to_seconds(chunk["timestamp"])
 
         # Find current chapter (last one before this timestamp)
@@ -36,7 +37,8 @@ def embed_transcript(srt_path: str, persist_dir: str = "vectorstore/youtube"):
             page_content=chunk["text"],
             metadata={
                 "timestamp": chunk["timestamp"],
-                "chapter_title": current_chapter or "Unknown"
+                "chapter_title": current_chapter or "Unknown",
+                "position": position
             }
         ))
 
@@ -51,6 +53,9 @@ def embed_transcript(srt_path: str, persist_dir: str = "vectorstore/youtube"):
     )
     vectorstore.persist()
 
+    # Time-ordered chunk array for neighbour expansion at query time
+    ChunkIndex.from_chunks(parsed_chunks, [d.metadata["chapter_title"] for d in docs]).save(persist_dir)
+
     print(f"✅ Embedded and stored in: {persist_dir}")
     return vectorstore
 
@@ -0,0 +1,51 @@
+from typing import List, Optional
+
+from langchain.callbacks.manager import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain.schema import BaseRetriever, Document
+
+from utils.chunk_index import ChunkIndex
+
+
+def expand_documents(docs: List[Document], index: Optional[ChunkIndex], window_seconds: int) -> List[Document]:
+    """Replace each retrieved chunk with the chunks around it, merging overlaps.
+
+    Chunks that can't be located in the index (or when there is no index)
+    are passed through unchanged after the expanded ones.
+    """
+    if index is None or window_seconds <= 0 or not docs:
+        return docs
+
+    positions, unlocated = [], []
+    for doc in docs:
+        position = index.locate(doc.metadata, doc.page_content)
+        if position is None:
+            unlocated.append(doc)
+        else:
+            positions.append(position)
+
+    expanded = [Document(page_content=span["text"], metadata=span["metadata"])
+                for span in index.expand(positions, window_seconds)]
+    return expanded + unlocated
+
+
+class NeighborExpansionRetriever(BaseRetriever):
+    """Wrap a vectorstore retriever and widen every hit to its neighbouring cues."""
+
+    base_retriever: BaseRetriever
+    index: Optional[ChunkIndex] = None
+    window_seconds: int = 10
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        docs = self.base_retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        return expand_documents(docs, self.index, self.window_seconds)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        docs = await self.base_retriever.ainvoke(query, config={"callbacks": run_manager.get_child()})
+        return expand_documents(docs, self.index, self.window_seconds)
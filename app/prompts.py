@@ -0,0 +1,31 @@
+from langchain.prompts import PromptTemplate
+
+
+# Custom prompt focused on Python programming
+QA_PROMPT = PromptTemplate(
+    input_variables=["context", "question"],
+    template="""
+You are a helpful assistant that answers questions about Python programming. Write a very short answer to the question, and provide an example"
+
+---
+
+Context:
+{context}
+
+---
+
+User Question: {question}
+
+Answer:
+"""
+)
+
+
+def build_challenge_prompt(assistant_answer: str) -> str:
+    """Prompt asking the LLM for a short beginner challenge based on an answer."""
+    return (
+        f"The user just learned from this assistant response:\n\"\"\"\n{assistant_answer}\n\"\"\"\n\n"
+        f"Now, write a very short Python challenge for a beginner to test their understanding of the same concept. "
+        f"⚠️ Important: Do not copy the example above. Make it different but still related. "
+        f"Only output the challenge instructions in 1–2 sentences — no code or explanation."
+    )
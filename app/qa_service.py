@@ -0,0 +1,359 @@
+import asyncio
+import contextlib
+import os
+import sys
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+from langchain_community.vectorstores import Chroma
+from langchain_groq import ChatGroq
+from langchain_openai import OpenAIEmbeddings
+from langchain.chains.question_answering import load_qa_chain
+from langchain.schema import Document
+
+from app.chapter_insights import INSIGHTS_FILE, aprecompute_chapter_insights, find_insight, load_insights
+from app.neighbor_retriever import expand_documents
+from app.prompts import QA_PROMPT, build_challenge_prompt
+from app.storage_manager import INGEST_LEASE_TTL, VIDEO_ID_PATTERN, StorageManager
+from app.youtube_processor import process_and_embed_video, extract_chapters, extract_video_id
+from utils.chapters import rank_sources_by_chapter_similarity
+from utils.chunk_index import ChunkIndex
+from utils.concurrency import InFlightCoalescer, bounded_semaphores
+from utils.time import timestamp_to_seconds
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Runs user code in a child interpreter: redirect_stdout in run_user_code is
+# process-wide, so it can't be shared between concurrent requests.
+CODE_RUNNER = (
+    "import sys\n"
+    "from utils.code_runner import run_user_code\n"
+    "sys.stdout.write(run_user_code(sys.stdin.read()))\n"
+)
+
+
+class VideoInUseError(RuntimeError):
+    """A forced re-ingest can't clear a store that other readers still hold leases on."""
+
+
+class ChaptersUnavailableError(RuntimeError):
+    """The video's chapters couldn't be fetched, so insights can't be sectioned yet."""
+
+
+def serialize_source(doc: Document) -> dict:
+    """Turn a retrieved chunk into the JSON shape returned by the API."""
+    ts = doc.metadata.get("timestamp", "00:00:00")
+    return {
+        "timestamp": ts,
+        "seconds": timestamp_to_seconds(ts),
+        "chapter_title": doc.metadata.get("chapter_title", "Unknown"),
+        "text": doc.page_content,
+    }
+
+
+class QAService:
+    """Async, UI-independent wrapper around the ingest → retrieve → answer pipeline.
+
+    Outbound calls to the LLM and embedding APIs go through pooled httpx
+    clients, every upstream (llm, embeddings, vectorstore, ingest, code) has
+    its own concurrency limit, and identical queries that arrive while one is
+    already running share its result.
+    """
+
+    def __init__(
+        self,
+        vectorstore_root: str = "vectorstore/youtube",
+        data_dir: str = "data",
+        k: int = 5,
+        neighbor_window: int = 10,
+        llm_model: str = "llama3-8b-8192",
+        llm_concurrency: int = 8,
+        embedding_concurrency: int = 16,
+        vectorstore_concurrency: int = 8,
+        ingest_concurrency: int = 2,
+        code_concurrency: int = 4,
+        max_connections: int = 32,
+        disk_budget_bytes: Optional[int] = None,
+        maintenance_interval: float = 900.0,
+    ):
+        self.vectorstore_root = vectorstore_root
+        self.data_dir = data_dir
+        self.k = k
+        self.neighbor_window = neighbor_window
+        self.llm_model = llm_model
+        self.max_connections = max_connections
+        self.maintenance_interval = maintenance_interval
+        self.storage = StorageManager(vectorstore_root, data_dir, budget_bytes=disk_budget_bytes)
+        self.storage.on_evict.append(self._forget)
+        self.limits = bounded_semaphores({
+            "llm": llm_concurrency,
+            "embeddings": embedding_concurrency,
+            "vectorstore": vectorstore_concurrency,
+            "ingest": ingest_concurrency,
+            "code": code_concurrency,
+        })
+        self.query_coalescer = InFlightCoalescer()
+        self.ingest_coalescer = InFlightCoalescer()
+        self._vectorstores: Dict[str, tuple] = {}
+        self._chapters: Dict[str, List[dict]] = {}
+        self._insights: Dict[str, tuple] = {}
+        self._chunk_indexes: Dict[str, Optional[ChunkIndex]] = {}
+        self._http: Optional[httpx.AsyncClient] = None
+        self.embeddings: Optional[OpenAIEmbeddings] = None
+        self.llm: Optional[ChatGroq] = None
+
+    async def start(self):
+        """Open the shared connection pool and build the LLM/embedding clients."""
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+            timeout=httpx.Timeout(60.0, connect=5.0),
+        )
+        # langchain_openai's class, not langchain_community's: only it accepts a
+        # shared http_async_client (same default model as the ingest embeddings)
+        self.embeddings = OpenAIEmbeddings(http_async_client=self._http)
+        self.llm = ChatGroq(
+            model=self.llm_model,
+            groq_api_key=os.getenv("GROQ_API_KEY"),
+            http_async_client=self._http,
+        )
+        self.storage.start_background(self.maintenance_interval)
+
+    async def close(self):
+        self.storage.stop_background()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def persist_dir(self, video_id: str) -> str:
+        return os.path.join(self.vectorstore_root, video_id)
+
+    def is_ingested(self, video_id: str) -> bool:
+        if not VIDEO_ID_PATTERN.fullmatch(video_id):
+            return False
+        path = self.persist_dir(video_id)
+        return os.path.exists(path) and bool(os.listdir(path))
+
+    def stats(self) -> dict:
+        return {
+            "queries_in_flight": len(self.query_coalescer),
+            "coalesced_queries": self.query_coalescer.hits,
+            "ingests_in_flight": len(self.ingest_coalescer),
+            "cached_vectorstores": len(self._vectorstores),
+        }
+
+    def _forget(self, video_id: str):
+        """Drop everything cached for a video, e.g. after re-ingest or eviction."""
+        self._vectorstores.pop(video_id, None)
+        self._chapters.pop(video_id, None)
+        self._chunk_indexes.pop(video_id, None)
+        self._insights.pop(video_id, None)
+
+    @contextlib.asynccontextmanager
+    async def _leased(self, video_id: str):
+        """Hold a storage lease so the video can't be evicted while it is being read."""
+        lease_id = await asyncio.to_thread(self.storage.acquire, video_id)
+        try:
+            if not self.is_ingested(video_id):
+                self._forget(video_id)
+                raise FileNotFoundError(f"Video {video_id} has not been ingested")
+            await asyncio.to_thread(self.storage.touch, video_id)
+            yield
+        finally:
+            await asyncio.to_thread(self.storage.release, video_id, lease_id)
+
+    # --- Ingest ---
+
+    async def ingest(self, url: str, force: bool = False, precompute_insights: bool = False) -> dict:
+        """Download captions and embed them, unless the video is already stored.
+
+        With precompute_insights, the chapter-insight stage then runs as its own
+        step, so it also fills in (or resumes) insights for videos already stored.
+        """
+        video_id = extract_video_id(url)
+        if not force and self.is_ingested(video_id):
+            result = {"video_id": video_id, "status": "cached"}
+        else:
+            # Copied: coalesced callers share the same dict
+            result = dict(await self.ingest_coalescer.run(
+                video_id, lambda: self._ingest(url, video_id, force)
+            ))
+        if precompute_insights:
+            # Separate key: a precompute request must not be absorbed by a plain ingest
+            result["insights"] = await self.ingest_coalescer.run(
+                (video_id, "insights"), lambda: self._precompute_insights(video_id)
+            )
+        return result
+
+    async def _ingest(self, url: str, video_id: str, force: bool = False) -> dict:
+        # Leased for the whole write: a half-written store has no registry entry
+        # yet and would otherwise be the first thing enforce_budget evicts
+        lease_id = await asyncio.to_thread(self.storage.acquire, video_id, None, INGEST_LEASE_TTL)
+        try:
+            # Chroma.from_documents appends with fresh ids, so re-embedding into an
+            # existing store would duplicate every chunk: clear it first
+            if force and self.is_ingested(video_id):
+                if not await asyncio.to_thread(self.storage.evict, video_id, lease_id):
+                    raise VideoInUseError(f"Video {video_id} is in use, try again later")
+                self._forget(video_id)
+            async with self.limits["ingest"]:
+                await asyncio.to_thread(
+                    process_and_embed_video, url, self.data_dir, self.persist_dir(video_id)
+                )
+        finally:
+            await asyncio.to_thread(self.storage.release, video_id, lease_id)
+        self._forget(video_id)
+        await asyncio.to_thread(self.storage.touch, video_id, False)
+        await asyncio.to_thread(self.storage.enforce_budget, {video_id})
+        return {"video_id": video_id, "status": "embedded"}
+
+    async def _precompute_insights(self, video_id: str) -> int:
+        """Generate missing chapter insights with the service's LLM client and limit."""
+        srt_path = os.path.join(self.data_dir, f"{video_id}_captions.srt")
+        if not os.path.exists(srt_path):
+            raise FileNotFoundError(f"No captions stored for video {video_id}")
+        # Fetched directly rather than through _chapters_for: sections saved from
+        # the no-chapters fallback would later mix with the real chapters' ones
+        try:
+            chapters = await asyncio.to_thread(extract_chapters, video_id)
+        except Exception as e:
+            raise ChaptersUnavailableError(f"Could not fetch chapters for video {video_id}: {e}") from e
+        self._chapters[video_id] = chapters
+        lease_id = await asyncio.to_thread(self.storage.acquire, video_id, None, INGEST_LEASE_TTL)
+        try:
+            insights = await aprecompute_chapter_insights(
+                srt_path, self.persist_dir(video_id), self.llm, self.limits["llm"], chapters
+            )
+        finally:
+            await asyncio.to_thread(self.storage.release, video_id, lease_id)
+        self._insights.pop(video_id, None)
+        return len(insights)
+
+    # --- Retrieval ---
+
+    def _vectorstore(self, video_id: str) -> Chroma:
+        # Keyed on the directory's inode so a store evicted and re-ingested by
+        # another worker isn't read through a stale client
+        inode = os.stat(self.persist_dir(video_id)).st_ino
+        cached = self._vectorstores.get(video_id)
+        if cached is None or cached[0] != inode:
+            self._forget(video_id)
+            cached = (inode, Chroma(
+                persist_directory=self.persist_dir(video_id),
+                embedding_function=self.embeddings,
+            ))
+            self._vectorstores[video_id] = cached
+        return cached[1]
+
+    async def _chapters_for(self, video_id: str) -> List[dict]:
+        if video_id not in self._chapters:
+            try:
+                self._chapters[video_id] = await asyncio.to_thread(extract_chapters, video_id)
+            except Exception:
+                # Chapters only affect ranking; don't fail the query over them.
+                # A successful insight precompute replaces this fallback.
+                self._chapters[video_id] = []
+        return self._chapters[video_id]
+
+    async def retrieve(self, video_id: str, question: str, k: Optional[int] = None) -> List[Document]:
+        """Embed the question, search the video's store, widen hits to their
+        neighbouring cues and rank by chapter similarity."""
+        async with self.limits["embeddings"]:
+            vector = await self.embeddings.aembed_query(question)
+        async with self._leased(video_id):
+            vectorstore = self._vectorstore(video_id)
+            async with self.limits["vectorstore"]:
+                docs = await asyncio.to_thread(
+                    vectorstore.similarity_search_by_vector, vector, k or self.k
+                )
+            if video_id not in self._chunk_indexes:
+                self._chunk_indexes[video_id] = await asyncio.to_thread(
+                    ChunkIndex.load, self.persist_dir(video_id)
+                )
+        docs = expand_documents(docs, self._chunk_indexes.get(video_id), self.neighbor_window)
+        chapters = await self._chapters_for(video_id)
+        return rank_sources_by_chapter_similarity(question, docs, chapters)
+
+    def _insights_for(self, video_id: str) -> Dict[str, dict]:
+        """Precomputed chapter insights, reloaded only when the file changes."""
+        path = os.path.join(self.persist_dir(video_id), INSIGHTS_FILE)
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        cached = self._insights.get(video_id)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, load_insights(self.persist_dir(video_id)) if mtime else {})
+            self._insights[video_id] = cached
+        return cached[1]
+
+    # --- Answering ---
+
+    async def query(self, video_id: str, question: str, k: Optional[int] = None,
+                    challenge: bool = False) -> dict:
+        """Answer a question; identical in-flight queries share one pipeline run."""
+        key = (video_id, question.strip(), k or self.k, challenge)
+        return await self.query_coalescer.run(
+            key, lambda: self._query(video_id, question, k, challenge)
+        )
+
+    async def _query(self, video_id: str, question: str, k: Optional[int], challenge: bool) -> dict:
+        docs = await self.retrieve(video_id, question, k)
+        chain = load_qa_chain(self.llm, chain_type="stuff", prompt=QA_PROMPT)
+        async with self.limits["llm"]:
+            result = await chain.ainvoke({"input_documents": docs, "question": question})
+        answer = result["output_text"]
+
+        response = {
+            "video_id": video_id,
+            "question": question,
+            "answer": answer,
+            "sources": [serialize_source(doc) for doc in docs],
+        }
+        if challenge:
+            top_seconds = response["sources"][0]["seconds"] if docs else 0
+            insight = find_insight(self._insights_for(video_id), top_seconds)
+            if insight:
+                response["challenge"] = insight["challenge"]
+                response["chapter_summary"] = insight["summary"]
+                response["key_terms"] = insight["key_terms"]
+            else:
+                async with self.limits["llm"]:
+                    message = await self.llm.ainvoke(build_challenge_prompt(answer))
+                response["challenge"] = message.content.strip()
+        return response
+
+    async def stream_query(self, video_id: str, question: str,
+                           k: Optional[int] = None) -> AsyncIterator[dict]:
+        """Yield the sources first, then answer tokens as the LLM produces them."""
+        docs = await self.retrieve(video_id, question, k)
+        yield {"type": "sources", "sources": [serialize_source(doc) for doc in docs]}
+
+        # Same prompt the "stuff" chain builds: chunk texts joined by blank lines
+        prompt = QA_PROMPT.format(
+            context="\n\n".join(doc.page_content for doc in docs), question=question
+        )
+        async with self.limits["llm"]:
+            async for chunk in self.llm.astream(prompt):
+                if chunk.content:
+                    yield {"type": "token", "content": chunk.content}
+        yield {"type": "done"}
+
+    # --- Code execution ---
+
+    async def run_code(self, code: str, timeout: float = 10.0) -> str:
+        """Run user code in a separate interpreter and return its output."""
+        async with self.limits["code"]:
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, "-c", CODE_RUNNER,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                cwd=PROJECT_ROOT,
+            )
+            try:
+                out, _ = await asyncio.wait_for(proc.communicate(code.encode("utf-8")), timeout)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                return f"⏱️ Timed out after {timeout:g}s"
+        return out.decode("utf-8", errors="replace").strip()
@@ -0,0 +1,324 @@
+import contextlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+REGISTRY_FILE = ".storage.json"
+LOCK_FILE = ".storage.lock"
+LEASES_DIR = ".leases"
+CHROMA_DB_FILE = "chroma.sqlite3"
+INGEST_LEASE_TTL = 6 * 3600.0  # long enough for a full embed + insight precompute
+# Video IDs end up in paths, so anything else (e.g. "..", ".leases") is rejected
+VIDEO_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+
+
+def check_video_id(video_id: str) -> str:
+    if not VIDEO_ID_PATTERN.fullmatch(video_id or ""):
+        raise ValueError(f"Invalid video ID: {video_id!r}")
+    return video_id
+
+
+def dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+class StorageManager:
+    """Track, cap and clean up the per-video artifacts on disk.
+
+    Each video owns vectorstore/youtube/<video_id>/ and data/<video_id>_captions.srt.
+    The manager records last access and hit counts in a small JSON registry,
+    evicts least-recently-used videos when the total goes over the budget,
+    and never touches a video that has an unexpired lease. Leases are files,
+    so they also protect stores used by other processes (API workers, other
+    Streamlit servers) sharing the same directory.
+    """
+
+    def __init__(self, vectorstore_root: str = "vectorstore/youtube", data_dir: str = "data",
+                 budget_bytes: Optional[int] = None, lease_ttl: float = 600.0):
+        self.vectorstore_root = vectorstore_root
+        self.data_dir = data_dir
+        self.budget_bytes = budget_bytes
+        self.lease_ttl = lease_ttl
+        self.on_evict: List[Callable[[str], None]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        os.makedirs(self.vectorstore_root, exist_ok=True)
+
+    # --- Paths ---
+
+    def persist_dir(self, video_id: str) -> str:
+        return os.path.join(self.vectorstore_root, check_video_id(video_id))
+
+    def srt_path(self, video_id: str) -> str:
+        return os.path.join(self.data_dir, f"{check_video_id(video_id)}_captions.srt")
+
+    def _lease_dir(self, video_id: str) -> str:
+        return os.path.join(self.vectorstore_root, LEASES_DIR, check_video_id(video_id))
+
+    def video_ids(self) -> List[str]:
+        """Videos with a store on disk (dot-entries are the manager's own files)."""
+        return sorted(
+            name for name in os.listdir(self.vectorstore_root)
+            if VIDEO_ID_PATTERN.fullmatch(name) and os.path.isdir(self.persist_dir(name))
+        )
+
+    # --- Registry ---
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Exclusive cross-process lock around registry, lease and eviction changes."""
+        with open(os.path.join(self.vectorstore_root, LOCK_FILE), "a+") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _read_registry(self) -> Dict[str, Dict]:
+        path = os.path.join(self.vectorstore_root, REGISTRY_FILE)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _write_registry(self, registry: Dict[str, Dict]):
+        path = os.path.join(self.vectorstore_root, REGISTRY_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(registry, f)
+        os.replace(path + ".tmp", path)
+
+    def touch(self, video_id: str, hit: bool = True):
+        """Record an access (and, by default, a query hit) for a video."""
+        check_video_id(video_id)
+        now = time.time()
+        with self._locked():
+            registry = self._read_registry()
+            entry = registry.setdefault(video_id, {"created": now, "hits": 0})
+            entry["last_access"] = now
+            if hit:
+                entry["hits"] += 1
+            self._write_registry(registry)
+
+    # --- Leases ---
+
+    def _active_leases(self, video_id: str, now: Optional[float] = None) -> List[str]:
+        now = now or time.time()
+        lease_dir = self._lease_dir(video_id)
+        if not os.path.isdir(lease_dir):
+            return []
+        active = []
+        for name in os.listdir(lease_dir):
+            try:
+                with open(os.path.join(lease_dir, name), "r") as f:
+                    expires = float(f.read() or 0)
+            except (OSError, ValueError):
+                continue
+            if expires > now:
+                active.append(name)
+        return active
+
+    def acquire(self, video_id: str, lease_id: Optional[str] = None, ttl: Optional[float] = None) -> str:
+        """Take (or renew) a lease: the video can't be evicted until it expires or is released."""
+        lease_id = lease_id or uuid.uuid4().hex
+        lease_dir = self._lease_dir(video_id)
+        with self._locked():
+            os.makedirs(lease_dir, exist_ok=True)
+            with open(os.path.join(lease_dir, lease_id), "w") as f:
+                f.write(str(time.time() + (ttl or self.lease_ttl)))
+        return lease_id
+
+    def release(self, video_id: str, lease_id: str):
+        with self._locked():
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(self._lease_dir(video_id), lease_id))
+
+    @contextlib.contextmanager
+    def lease(self, video_id: str, ttl: Optional[float] = None):
+        """Hold a lease for the duration of a block, e.g. one query."""
+        lease_id = self.acquire(video_id, ttl=ttl)
+        try:
+            yield lease_id
+        finally:
+            self.release(video_id, lease_id)
+
+    def prune_leases(self):
+        """Delete expired lease files left behind by closed sessions or crashed workers."""
+        root = os.path.join(self.vectorstore_root, LEASES_DIR)
+        if not os.path.isdir(root):
+            return
+        now = time.time()
+        with self._locked():
+            for video_id in os.listdir(root):
+                if not VIDEO_ID_PATTERN.fullmatch(video_id):
+                    continue
+                lease_dir = self._lease_dir(video_id)
+                active = set(self._active_leases(video_id, now))
+                for name in os.listdir(lease_dir):
+                    if name not in active:
+                        with contextlib.suppress(OSError):
+                            os.remove(os.path.join(lease_dir, name))
+                with contextlib.suppress(OSError):
+                    os.rmdir(lease_dir)  # only succeeds once it's empty
+
+    # --- Footprint and status ---
+
+    def footprint(self, video_id: str) -> int:
+        size = dir_size(self.persist_dir(video_id))
+        if os.path.exists(self.srt_path(video_id)):
+            size += os.path.getsize(self.srt_path(video_id))
+        return size
+
+    def status(self) -> List[Dict]:
+        """Per-video footprint, last access, hit count and active leases, largest first."""
+        registry = self._read_registry()
+        now = time.time()
+        rows = []
+        for video_id in self.video_ids():
+            entry = registry.get(video_id, {})
+            created = entry.get("created", now)
+            days = max((now - created) / 86400, 1 / 24)
+            rows.append({
+                "video_id": video_id,
+                "bytes": self.footprint(video_id),
+                "last_access": entry.get("last_access"),
+                "hits": entry.get("hits", 0),
+                "hits_per_day": round(entry.get("hits", 0) / days, 2),
+                "active_leases": len(self._active_leases(video_id, now)),
+            })
+        rows.sort(key=lambda r: r["bytes"], reverse=True)
+        return rows
+
+    # --- Eviction ---
+
+    def _delete(self, video_id: str, registry: Dict[str, Dict]):
+        shutil.rmtree(self.persist_dir(video_id), ignore_errors=True)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.srt_path(video_id))
+        registry.pop(video_id, None)
+        for callback in self.on_evict:
+            callback(video_id)
+
+    def evict(self, video_id: str, ignore_lease: Optional[str] = None) -> bool:
+        """Delete one video's artifacts unless someone else holds a lease on it.
+
+        ignore_lease lets a session evict a video it is itself using; that
+        lease stays in place, e.g. to protect a re-ingest into the same path.
+        Raises FileNotFoundError for videos that have no store on disk.
+        """
+        if video_id not in self.video_ids():
+            raise FileNotFoundError(f"Video {video_id} has no stored artifacts")
+        with self._locked():
+            others = [lease for lease in self._active_leases(video_id) if lease != ignore_lease]
+            if others:
+                return False
+            registry = self._read_registry()
+            self._delete(video_id, registry)
+            self._write_registry(registry)
+        return True
+
+    def enforce_budget(self, protect: Iterable[str] = ()) -> List[str]:
+        """Evict least-recently-used, unleased videos until the total fits the budget."""
+        if self.budget_bytes is None:
+            return []
+        protect = set(protect)
+        evicted = []
+        with self._locked():
+            registry = self._read_registry()
+            sizes = {video_id: self.footprint(video_id) for video_id in self.video_ids()}
+            total = sum(sizes.values())
+            lru = sorted(sizes, key=lambda v: registry.get(v, {}).get("last_access", 0))
+            for video_id in lru:
+                if total <= self.budget_bytes:
+                    break
+                if video_id in protect or self._active_leases(video_id):
+                    continue
+                self._delete(video_id, registry)
+                total -= sizes[video_id]
+                evicted.append(video_id)
+            self._write_registry(registry)
+        for video_id in evicted:
+            print(f"🧹 Evicted {video_id} to stay within the disk budget")
+        return evicted
+
+    # --- Compaction ---
+
+    def compact(self, video_id: str) -> bool:
+        """VACUUM the video's Chroma database and drop leftover temp files.
+
+        Skipped while the video is leased: VACUUM needs the database to itself.
+        """
+        persist_dir = self.persist_dir(video_id)
+        with self._locked():
+            if self._active_leases(video_id) or not os.path.isdir(persist_dir):
+                return False
+            for root, _, files in os.walk(persist_dir):
+                for name in files:
+                    if name.endswith(".tmp"):
+                        os.remove(os.path.join(root, name))
+            db_path = os.path.join(persist_dir, CHROMA_DB_FILE)
+            if os.path.exists(db_path):
+                conn = sqlite3.connect(db_path)
+                try:
+                    conn.execute("VACUUM")
+                finally:
+                    conn.close()
+        return True
+
+    def maintenance(self):
+        """One background pass: prune leases, compact idle stores, enforce the budget."""
+        self.prune_leases()
+        for video_id in self.video_ids():
+            try:
+                self.compact(video_id)
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not compact {video_id}: {e}")
+        self.enforce_budget()
+
+    def start_background(self, interval: float = 900.0):
+        """Run maintenance() every `interval` seconds in a daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.maintenance()
+                except Exception as e:
+                    print(f"⚠️ Storage maintenance failed: {e}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name="storage-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop_background(self):
+        self._stop.set()
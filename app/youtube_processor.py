@@ -83,9 +83,17 @@ def extract_chapters(video_id: str) -> list[dict]:
     return chapters
 
 
-def process_and_embed_video(url: str, output_dir: str = "data", persist_dir: str = "vectorstore/youtube") -> str:
-    """Full pipeline: download captions, embed transcript, return video ID."""
+def process_and_embed_video(url: str, output_dir: str = "data", persist_dir: str = "vectorstore/youtube",
+                            precompute_insights: bool = False, insight_workers: int = 4) -> str:
+    """Full pipeline: download captions, embed transcript, return video ID.
+
+    With precompute_insights, also generate per-chapter summaries and challenges
+    (see app.chapter_insights) so queries don't need an extra LLM call for them.
+    """
     srt_path = save_captions(url, output_dir)
     embed_transcript(srt_path, persist_dir=persist_dir)
+    if precompute_insights:
+        from app.chapter_insights import precompute_chapter_insights
+        precompute_chapter_insights(srt_path, persist_dir, max_workers=insight_workers)
     return extract_video_id(url)
 
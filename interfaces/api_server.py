@@ -0,0 +1,147 @@
+from dotenv import load_dotenv
+load_dotenv()
+import asyncio
+import json
+import os
+import sys
+from contextlib import asynccontextmanager
+from typing import Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from app.qa_service import ChaptersUnavailableError, QAService, VideoInUseError
+
+# Run with: uvicorn interfaces.api_server:app --host 0.0.0.0 --port 8000 --workers 4
+# Limits are per worker process; tune them with the QA_* environment variables.
+# POST /run executes arbitrary Python and has no authentication, so it is off
+# unless QA_ENABLE_CODE_RUN=1; only enable it on localhost or a trusted network.
+CODE_RUN_ENABLED = os.getenv("QA_ENABLE_CODE_RUN", "").lower() in ("1", "true", "yes")
+
+
+def env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def env_megabytes(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(float(value) * 1024 * 1024) if value else None
+
+
+service = QAService(
+    vectorstore_root=os.getenv("QA_VECTORSTORE_ROOT", "vectorstore/youtube"),
+    data_dir=os.getenv("QA_DATA_DIR", "data"),
+    k=env_int("QA_TOP_K", 5),
+    neighbor_window=env_int("QA_NEIGHBOR_WINDOW", 10),
+    llm_concurrency=env_int("QA_LLM_CONCURRENCY", 8),
+    embedding_concurrency=env_int("QA_EMBEDDING_CONCURRENCY", 16),
+    vectorstore_concurrency=env_int("QA_VECTORSTORE_CONCURRENCY", 8),
+    ingest_concurrency=env_int("QA_INGEST_CONCURRENCY", 2),
+    code_concurrency=env_int("QA_CODE_CONCURRENCY", 4),
+    max_connections=env_int("QA_MAX_CONNECTIONS", 32),
+    disk_budget_bytes=env_megabytes("QA_DISK_BUDGET_MB"),
+    maintenance_interval=env_int("QA_MAINTENANCE_INTERVAL", 900),
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await service.start()
+    yield
+    await service.close()
+
+
+app = FastAPI(title="YouTube Q&A API", lifespan=lifespan)
+
+
+class IngestRequest(BaseModel):
+    url: str
+    force: bool = False
+    precompute_insights: bool = False
+
+
+class QueryRequest(BaseModel):
+    video_id: str
+    question: str
+    k: Optional[int] = None
+    stream: bool = False
+    challenge: bool = False
+
+
+class CodeRequest(BaseModel):
+    code: str
+    timeout: float = 10.0
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", **service.stats()}
+
+
+@app.get("/storage")
+async def storage():
+    videos = await asyncio.to_thread(service.storage.status)
+    return {
+        "budget_bytes": service.storage.budget_bytes,
+        "total_bytes": sum(v["bytes"] for v in videos),
+        "videos": videos,
+    }
+
+
+@app.delete("/videos/{video_id}")
+async def delete_video(video_id: str):
+    try:
+        evicted = await asyncio.to_thread(service.storage.evict, video_id)
+    except (ValueError, FileNotFoundError):
+        raise HTTPException(status_code=404, detail=f"Video {video_id} not found")
+    if not evicted:
+        raise HTTPException(status_code=409, detail=f"Video {video_id} is in use, try again later")
+    return {"video_id": video_id, "status": "evicted"}
+
+
+@app.post("/ingest")
+async def ingest(req: IngestRequest):
+    try:
+        return await service.ingest(
+            req.url, force=req.force, precompute_insights=req.precompute_insights
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except VideoInUseError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ChaptersUnavailableError as e:
+        raise HTTPException(status_code=503, detail=f"{e}; try again later")
+
+
+@app.post("/query")
+async def query(req: QueryRequest):
+    if not req.question.strip():
+        raise HTTPException(status_code=400, detail="Question must not be empty")
+    if not service.is_ingested(req.video_id):
+        raise HTTPException(status_code=404, detail=f"Video {req.video_id} has not been ingested")
+
+    if req.stream:
+        async def events():
+            # One JSON object per line: sources, then tokens, then done
+            async for event in service.stream_query(req.video_id, req.question, req.k):
+                yield json.dumps(event) + "\n"
+        return StreamingResponse(events(), media_type="application/x-ndjson")
+
+    try:
+        return await service.query(req.video_id, req.question, req.k, challenge=req.challenge)
+    except FileNotFoundError as e:
+        # Evicted between the check above and the read
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.post("/run")
+async def run(req: CodeRequest):
+    if not CODE_RUN_ENABLED:
+        raise HTTPException(status_code=403, detail="Code execution is disabled (set QA_ENABLE_CODE_RUN=1)")
+    output = await service.run_code(req.code, timeout=min(req.timeout, 30.0))
+    return {"output": output}
@@ -0,0 +1,139 @@
+import streamlit as st
+
+from utils.chat_history import extract_code, summarize_message
+from utils.code_runner import run_user_code
+
+
+def jump_to(seconds: int):
+    """Button callback: runs before the rerun, so the shared player sees the new time."""
+    st.session_state.video_timestamp = seconds
+    st.session_state.jump_triggered = True
+    st.session_state.auto_play = True
+    # Counted so a jump to the time the player already points at still reloads it
+    st.session_state.jump_count = st.session_state.get("jump_count", 0) + 1
+
+
+def toggle_turn(turn: int, state_key: str):
+    opened = st.session_state[state_key]
+    if turn in opened:
+        opened.discard(turn)
+    else:
+        opened.add(turn)
+
+
+def player_url(video_id: str, seconds: int, autoplay: bool = False, jump: int = 0) -> str:
+    url = f"https://www.youtube.com/embed/{video_id}?start={seconds}&autoplay={int(autoplay)}"
+    # YouTube ignores the extra parameter; it only makes each jump a new src
+    return f"{url}&jump={jump}" if jump else url
+
+
+def render_video_player(video_id: str, seconds: int, autoplay: bool = False, height: int = 360):
+    st.components.v1.iframe(player_url(video_id, seconds, autoplay), height=height)
+
+
+def render_shared_player(video_id: str, height: int = 360):
+    """One player for the whole chat.
+
+    Its URL only changes on an explicit jump or a new video/timestamp: any
+    other change to the iframe src (e.g. autoplay flipping back to 0) reloads
+    the player and stops whatever the user is watching.
+    """
+    target = (video_id, st.session_state.video_timestamp, st.session_state.get("jump_count", 0))
+    if st.session_state.get("player_target") != target:
+        st.session_state.player_target = target
+        st.session_state.player_src = player_url(video_id, target[1], st.session_state.auto_play, target[2])
+    st.session_state.auto_play = False
+    st.components.v1.iframe(st.session_state.player_src, height=height)
+
+
+def render_sources(sources: list, turn: int):
+    with st.expander("📚 Sources", expanded=False):
+        for j, src in enumerate(sources):
+            col1, col2 = st.columns([1, 6])
+            with col1:
+                st.button(f"⏩ {src['timestamp']}", key=f"jump_{turn}_{j}",
+                          on_click=jump_to, args=(src["seconds"],))
+            with col2:
+                st.markdown(f"_{src['snippet']}..._")
+
+
+def render_learn_more(msg: dict, turn: int):
+    st.button("📚 Learn more", key=f"learn_more_btn_{turn}",
+              on_click=toggle_turn, args=(turn, "learn_more_open"))
+    if turn not in st.session_state.learn_more_open:
+        return
+
+    with st.expander("💬 Assistant's Answer and Challenge", expanded=True):
+        st.markdown("### 🤖 Assistant's Answer")
+        st.write(msg["message"])
+        if msg.get("chapter_summary"):
+            st.caption(f"📖 This part of the video: {msg['chapter_summary']}")
+        if msg.get("key_terms"):
+            st.caption("🔑 Key terms: " + ", ".join(f"`{t}`" for t in msg["key_terms"]))
+
+        code = extract_code(msg["message"])
+        if code:
+            st.markdown("🧚 Try the example below:")
+            editable_code = st.text_area("🖍️ Edit & Run Python", value=code, height=200, key=f"code_{turn}")
+            if st.button("▶️ Run Code", key=f"run_{turn}"):
+                with st.spinner("Running..."):
+                    output = run_user_code(editable_code)
+                st.code(output or "✅ No output", language="text")
+
+        challenge = msg.get("challenge", "")
+        if challenge:
+            st.markdown("### 🤩 Your Challenge")
+            st.info(challenge)
+            user_solution = st.text_area("💡 Write your solution here:", height=200, key=f"solution_{turn}")
+            if st.button("✅ Run My Solution", key=f"solution_run_{turn}"):
+                with st.spinner("Running your solution..."):
+                    output = run_user_code(user_solution)
+                st.code(output or "✅ No output", language="text")
+
+
+def render_assistant_turn(msg: dict, turn: int, video_id: str, own_player: bool):
+    if own_player:
+        render_video_player(video_id, msg["timestamp"])
+    render_sources(msg.get("sources", []), turn)
+    render_learn_more(msg, turn)
+
+
+def render_collapsed_turn(msg: dict, turn: int):
+    """Cheap stand-in for an older answer; the full widgets load when expanded."""
+    col1, col2 = st.columns([6, 1])
+    with col1:
+        st.markdown(summarize_message(msg["message"]) or "_(empty answer)_")
+    with col2:
+        expanded = turn in st.session_state.expanded_turns
+        st.button("🔼 Hide" if expanded else "🔽 Details", key=f"expand_{turn}",
+                  on_click=toggle_turn, args=(turn, "expanded_turns"))
+
+
+def render_history(history: list, video_id: str, compact: bool = True):
+    """Render the chat.
+
+    In compact mode only the newest answer (and any the user expanded) gets
+    its sources, code and challenge widgets; older answers show a one-line
+    summary, and a single shared player replaces the per-answer iframes.
+    In full mode every answer is rendered with its own player, as before.
+    """
+    if compact:
+        render_shared_player(video_id)
+
+    last_turn = sum(1 for role, _ in history if role == "assistant") - 1
+    turn = 0
+    for role, msg in history:
+        with st.chat_message(role):
+            if role == "user":
+                st.write(msg)
+                continue
+
+            if not compact:
+                render_assistant_turn(msg, turn, video_id, own_player=True)
+            elif turn == last_turn:
+                render_assistant_turn(msg, turn, video_id, own_player=False)
+            else:
+                render_collapsed_turn(msg, turn)
+                if turn in st.session_state.expanded_turns:
+                    render_assistant_turn(msg, turn, video_id, own_player=False)
+            turn += 1
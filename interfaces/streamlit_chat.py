@@ -1,9 +1,6 @@
 import streamlit as st
 from dotenv import load_dotenv
 import os
-import shutil
-import time
-import re
 import sys
 from urllib.parse import urlparse, parse_qs
 
@@ -13,13 +10,18 @@ from langchain.chains import RetrievalQA
 from langchain_community.vectorstores import Chroma
 from langchain_community.embeddings import OpenAIEmbeddings
 from langchain_groq import ChatGroq
-from langchain.prompts import PromptTemplate
 from langchain.chains.question_answering import load_qa_chain
 
 from app.youtube_processor import process_and_embed_video, extract_chapters, extract_video_id
+from app.prompts import QA_PROMPT, build_challenge_prompt
+from app.chapter_insights import load_insights, find_insight, precompute_chapter_insights
+from app.neighbor_retriever import NeighborExpansionRetriever
+from app.storage_manager import INGEST_LEASE_TTL, StorageManager
+from utils.chunk_index import ChunkIndex, CHUNK_INDEX_FILE
 from utils.time import timestamp_to_seconds
 from utils.chapters import rank_sources_by_chapter_similarity
-from utils.code_runner import run_user_code
+from utils.chat_history import compact_sources
+from interfaces.chat_render import jump_to, render_history
 
 import json
 from datetime import datetime
@@ -27,24 +29,21 @@ from datetime import datetime
 # Load environment variables
 load_dotenv()
 
-# Custom prompt focused on Python programming
-QA_PROMPT = PromptTemplate(
-    input_variables=["context", "question"],
-    template="""
-You are a helpful assistant that answers questions about Python programming. Write a very short answer to the question, and provide an example"
 
----
+@st.cache_resource
+def load_chunk_index(persist_dir: str, mtime: float):
+    """Cached per index file version; mtime is only part of the cache key."""
+    return ChunkIndex.load(persist_dir)
 
-Context:
-{context}
 
----
+@st.cache_resource
+def get_storage_manager():
+    """One manager per server process; its maintenance thread is shared by all sessions."""
+    budget_mb = os.getenv("VECTORSTORE_BUDGET_MB")
+    manager = StorageManager(budget_bytes=int(float(budget_mb) * 1024 * 1024) if budget_mb else None)
+    manager.start_background()
+    return manager
 
-User Question: {question}
-
-Answer:
-"""
-)
 
 # --- Streamlit config ---
 st.set_page_config(page_title="YouTube Q&A Bot", layout="wide")
@@ -56,15 +55,23 @@ for key, default in {
     "chat_history": [],
     "jump_triggered": False,
     "auto_play": False,
-    "last_result_docs_list": [],
-    "challenge_list": [],
-    "learn_more_open": []
+    "jump_count": 0,
+    "learn_more_open": set(),
+    "expanded_turns": set()
 }.items():
     if key not in st.session_state:
         st.session_state[key] = default
 
 # --- Sidebar: Input ---
 video_url = st.sidebar.text_input("Paste YouTube video link:")
+compact_history = st.sidebar.checkbox(
+    "⚡ Compact history", value=True,
+    help="Render only the newest answer in full and share one video player"
+)
+neighbor_window = st.sidebar.slider(
+    "🔭 Context around each source (seconds)", min_value=0, max_value=60, value=10,
+    help="Widen each retrieved caption with the captions around it"
+)
 
 if video_url and "video_url" not in st.session_state:
     st.session_state.video_url = video_url
@@ -76,33 +83,75 @@ if video_url:
         st.session_state.video_id = video_id
         persist_dir = os.path.join("vectorstore", "youtube", video_id)
 
+        # Renewed on every rerun: while this session is active the video can't be evicted
+        storage = get_storage_manager()
+        st.session_state.storage_lease = storage.acquire(video_id, st.session_state.get("storage_lease"))
+
         if st.sidebar.button("🗑️ Clear vectorstore cache for this video"):
-            if os.path.exists(persist_dir):
-                shutil.rmtree(persist_dir)
-                time.sleep(0.5)
-                os.makedirs(persist_dir, exist_ok=True)
-                st.sidebar.success("🧹 Cache cleared. Reprocessing will occur on reload.")
+            if not os.path.exists(persist_dir):
+                st.sidebar.info("Nothing cached for this video yet.")
+            elif storage.evict(video_id, ignore_lease=st.session_state.storage_lease):
+                st.sidebar.success("🧹 Cache cleared. Reprocessing now.")
+            else:
+                st.sidebar.warning("⏳ Another session is using this video; try again later.")
 
         if not os.path.exists(persist_dir) or not os.listdir(persist_dir):
-            process_and_embed_video(video_url, persist_dir=persist_dir)
+            with storage.lease(video_id, ttl=INGEST_LEASE_TTL):
+                process_and_embed_video(video_url, persist_dir=persist_dir)
+            storage.touch(video_id, hit=False)
+            evicted = storage.enforce_budget(protect={video_id})
             st.sidebar.success("✅ Video processed and embedded")
+            if evicted:
+                st.sidebar.caption(f"🧹 Evicted {len(evicted)} older video(s) to stay within the disk budget")
         else:
             st.sidebar.info("📂 Using cached vectorstore")
 
+        if st.sidebar.checkbox("💾 Show storage status"):
+            status = storage.status()
+            total_mb = sum(row["bytes"] for row in status) / 1024 / 1024
+            budget = f" / {storage.budget_bytes / 1024 / 1024:.0f} MB" if storage.budget_bytes else ""
+            st.sidebar.caption(f"{total_mb:.1f} MB{budget} across {len(status)} video(s)")
+            st.sidebar.dataframe([
+                {
+                    "video": row["video_id"],
+                    "MB": round(row["bytes"] / 1024 / 1024, 1),
+                    "hits": row["hits"],
+                    "hits/day": row["hits_per_day"],
+                    "last used": datetime.fromtimestamp(row["last_access"]).strftime("%Y-%m-%d %H:%M") if row["last_access"] else "",
+                    "in use": row["active_leases"],
+                }
+                for row in status
+            ], hide_index=True)
+
         chapters = extract_chapters(video_id)
         if chapters:
             st.sidebar.markdown("### 📁 Video Chapters")
             for chap in chapters:
-                if st.sidebar.button(f"⏩ {chap['timestamp']} - {chap['title']}", key=f"chapter_{chap['seconds']}"):
-                    st.session_state.video_timestamp = chap["seconds"]
-                    st.session_state.auto_play = True
-                    st.session_state.jump_triggered = True
+                st.sidebar.button(f"⏩ {chap['timestamp']} - {chap['title']}", key=f"chapter_{chap['seconds']}",
+                                  on_click=jump_to, args=(chap["seconds"],))
         else:
             st.sidebar.markdown("_No chapters found in the video description._")
 
+        srt_path = os.path.join("data", f"{video_id}_captions.srt")
+        if os.path.exists(srt_path) and st.sidebar.button("🧠 Precompute chapter challenges"):
+            with st.sidebar.status("Generating chapter summaries and challenges..."):
+                # Resumes from whatever a previous (interrupted) run already stored
+                with storage.lease(video_id, ttl=INGEST_LEASE_TTL):
+                    precompute_chapter_insights(srt_path, persist_dir, chapters=chapters)
+        insights = load_insights(persist_dir)
+        if insights:
+            st.sidebar.caption(f"🧠 Precomputed challenges for {len(insights)} sections")
+
         embeddings = OpenAIEmbeddings()
         vectorstore = Chroma(persist_directory=persist_dir, embedding_function=embeddings)
         retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
+        index_path = os.path.join(persist_dir, CHUNK_INDEX_FILE)
+        if neighbor_window and os.path.exists(index_path):
+            retriever = NeighborExpansionRetriever(
+                base_retriever=retriever,
+                index=load_chunk_index(persist_dir, os.path.getmtime(index_path)),
+                window_seconds=neighbor_window
+            )
 
         llm = ChatGroq(model="llama3-8b-8192", groq_api_key=os.getenv("GROQ_API_KEY"))
         qa_chain = RetrievalQA(
@@ -115,6 +164,7 @@ if video_url:
 
         if query:
             st.session_state.chat_history.append(("user", query))
+            storage.touch(video_id)
 
             with st.spinner("🤖 Thinking..."):
                 result = qa_chain.invoke({"query": query})
@@ -123,23 +173,26 @@ if video_url:
                 )
                 assistant_answer = result["result"]
 
-                challenge_prompt = (
-                    f"The user just learned from this assistant response:\n\"\"\"\n{assistant_answer}\n\"\"\"\n\n"
-                    f"Now, write a very short Python challenge for a beginner to test their understanding of the same concept. "
-                    f"⚠️ Important: Do not copy the example above. Make it different but still related. "
-                    f"Only output the challenge instructions in 1–2 sentences — no code or explanation."
-                )
-                challenge = llm.invoke(challenge_prompt).content.strip()
+                ts = result["source_documents"][0].metadata.get("timestamp", "00:00:00") if result["source_documents"] else "00:00:00"
+                # Serve the challenge for the top source's chapter if it was precomputed
+                insight = find_insight(insights, timestamp_to_seconds(ts))
+                if insight:
+                    challenge = insight["challenge"]
+                else:
+                    challenge_prompt = build_challenge_prompt(assistant_answer)
+                    challenge = llm.invoke(challenge_prompt).content.strip()
 
-            ts = result["source_documents"][0].metadata.get("timestamp", "00:00:00") if result["source_documents"] else "00:00:00"
+            # Compact record: no Document objects are kept in session state
             assistant_entry = {
                 "message": assistant_answer,
-                "timestamp": timestamp_to_seconds(ts)
+                "timestamp": timestamp_to_seconds(ts),
+                "sources": compact_sources(result["source_documents"]),
+                "challenge": challenge,
+                "chapter_summary": insight["summary"] if insight else "",
+                "key_terms": insight["key_terms"] if insight else []
             }
             st.session_state.chat_history.append(("assistant", assistant_entry))
-            st.session_state.last_result_docs_list.append(result["source_documents"])
-            st.session_state.challenge_list.append(challenge)
-            st.session_state.learn_more_open.append(False)
+            st.session_state.video_timestamp = assistant_entry["timestamp"]
             # ✅ Log interaction for evaluation
             log_data = {
                 "timestamp": datetime.now().isoformat(),
@@ -159,64 +212,7 @@ if video_url:
                 f.write(json.dumps(log_data) + "\n")
 
 
-        assistant_index = 0
-        for i, (role, msg) in enumerate(st.session_state.chat_history):
-            with st.chat_message(role):
-                if role == "user":
-                    st.write(msg)
-                elif role == "assistant":
-                    seconds = msg["timestamp"]
-                    video_id = st.session_state.get("video_id", "")
-                    embed_url = f"https://www.youtube.com/embed/{video_id}?start={seconds}&autoplay=0"
-                    #st.markdown(f"`[debug] video timestamp:` `{seconds}` seconds")
-                    st.components.v1.iframe(embed_url, height=360)
-
-                    if assistant_index < len(st.session_state.last_result_docs_list):
-                        with st.expander("📚 Sources", expanded=False):
-                            for j, doc in enumerate(st.session_state.last_result_docs_list[assistant_index]):
-                                doc_ts = doc.metadata.get("timestamp", "00:00:00")
-                                seconds_doc = timestamp_to_seconds(doc_ts)
-                                snippet = doc.page_content[:200].replace("\n", " ")
-                                col1, col2 = st.columns([1, 6])
-                                with col1:
-                                    if st.button(f"⏩ {doc_ts}", key=f"jump_{assistant_index}_{j}"):
-                                        st.session_state.video_timestamp = seconds_doc
-                                        st.session_state.jump_triggered = True
-                                        st.session_state.auto_play = True
-                                with col2:
-                                    st.markdown(f"_{snippet}..._")
-
-                    while len(st.session_state.learn_more_open) <= assistant_index:
-                        st.session_state.learn_more_open.append(False)
-
-                    if st.button("📚 Learn more", key=f"learn_more_btn_{assistant_index}"):
-                        st.session_state.learn_more_open[assistant_index] = not st.session_state.learn_more_open[assistant_index]
-
-                    if st.session_state.learn_more_open[assistant_index]:
-                        with st.expander("💬 Assistant's Answer and Challenge", expanded=True):
-                            st.markdown("### 🤖 Assistant's Answer")
-                            st.write(msg["message"])
-
-                            match = re.search(r"```(?:python)?\n(.*?)```", msg["message"], re.DOTALL)
-                            if match:
-                                code = match.group(1)
-                                st.markdown("🧚 Try the example below:")
-                                editable_code = st.text_area("🖍️ Edit & Run Python", value=code, height=200, key=f"code_{assistant_index}")
-                                if st.button("▶️ Run Code", key=f"run_{assistant_index}"):
-                                    with st.spinner("Running..."):
-                                        output = run_user_code(editable_code)
-                                    st.code(output or "✅ No output", language="text")
-
-                            challenge = st.session_state.challenge_list[assistant_index] if assistant_index < len(st.session_state.challenge_list) else ""
-                            if challenge:
-                                st.markdown("### 🤩 Your Challenge")
-                                st.info(challenge)
-                                user_solution = st.text_area("💡 Write your solution here:", height=200, key=f"solution_{assistant_index}")
-                                if st.button("✅ Run My Solution", key=f"solution_run_{assistant_index}"):
-                                    with st.spinner("Running your solution..."):
-                                        output = run_user_code(user_solution)
-                                    st.code(output or "✅ No output", language="text")
-                    assistant_index += 1
+        render_history(st.session_state.chat_history, video_id, compact=compact_history)
 
         if st.session_state.jump_triggered:
             st.session_state.jump_triggered = False
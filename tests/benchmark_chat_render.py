@@ -0,0 +1,90 @@
+"""Benchmark Streamlit rerun time against chat history length.
+
+Usage:
+    python tests/benchmark_chat_render.py --lengths 5 20 50 100 --reruns 5
+
+Runs interfaces/chat_render.render_history headlessly with Streamlit's AppTest
+on synthetic histories, in full and compact mode, and reports the median
+rerun time and the number of elements built per rerun.
+"""
+import argparse
+import os
+import pickle
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from streamlit.testing.v1 import AppTest
+
+ANSWER = (
+    "A list comprehension builds a new list from an iterable in one line.\n\n"
+    "```python\nsquares = [n * n for n in range(10)]\nprint(squares)\n```"
+)
+
+
+def make_history(turns: int) -> list:
+    history = []
+    for i in range(turns):
+        history.append(("user", f"Question {i}: how do list comprehensions work?"))
+        history.append(("assistant", {
+            "message": ANSWER,
+            "timestamp": 60 * i,
+            "sources": [{"timestamp": f"00:{i % 60:02d}:{j * 10:02d}", "seconds": 60 * i + j * 10,
+                         "snippet": "so here we loop over the numbers and square each one " * 3}
+                        for j in range(5)],
+            "challenge": "Write a list comprehension that keeps only the even numbers from 1 to 20.",
+        }))
+    return history
+
+
+def app():
+    import streamlit as st
+    from interfaces.chat_render import render_history
+
+    for key, default in {"video_timestamp": 0, "auto_play": False, "jump_triggered": False, "jump_count": 0,
+                         "learn_more_open": set(), "expanded_turns": set()}.items():
+        if key not in st.session_state:
+            st.session_state[key] = default
+    render_history(st.session_state.chat_history, "rfscVS0vtbw", compact=st.session_state.compact)
+
+
+def count_elements(node) -> int:
+    children = getattr(node, "children", None) or {}
+    return 1 + sum(count_elements(child) for child in children.values())
+
+
+def bench(turns: int, compact: bool, reruns: int):
+    at = AppTest.from_function(app, default_timeout=60)
+    at.session_state["chat_history"] = make_history(turns)
+    at.session_state["compact"] = compact
+    # Open "Learn more" everywhere: worst case for full mode, only the newest turn matters in compact mode
+    at.session_state["learn_more_open"] = set(range(turns))
+    at.run()
+
+    timings = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), count_elements(at._tree)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[5, 20, 50, 100])
+    parser.add_argument("--reruns", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'turns':>6} {'state KB':>9} {'full ms':>9} {'full els':>9} {'compact ms':>11} {'compact els':>12}")
+    for turns in args.lengths:
+        state_kb = len(pickle.dumps(make_history(turns))) / 1024
+        full_ms, full_els = bench(turns, compact=False, reruns=args.reruns)
+        compact_ms, compact_els = bench(turns, compact=True, reruns=args.reruns)
+        print(f"{turns:>6} {state_kb:>9.1f} {full_ms * 1000:>9.1f} {full_els:>9} "
+              f"{compact_ms * 1000:>11.1f} {compact_els:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""Load test for interfaces/api_server.py against local stub LLM and embedding servers.
+
+Usage:
+    python tests/load_test_api.py --requests 200 --concurrency 32 --distinct 10
+
+Starts an OpenAI-compatible embeddings stub and a Groq-compatible chat stub,
+seeds a vectorstore from a local caption file, launches the API with uvicorn
+and reports latency, throughput and how many upstream calls were made.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+VIDEO_ID = "rfscVS0vtbw"
+SRT_PATH = os.path.join(PROJECT_ROOT, "data", f"{VIDEO_ID}_captions.srt")
+EMBEDDING_DIM = 64
+STUB_ANSWER = "A for loop repeats code for each item.\n```python\nfor n in range(3):\n    print(n)\n```"
+
+upstream_calls = {"embeddings": 0, "chat": 0}
+calls_lock = threading.Lock()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def fake_vector(item) -> list:
+    """Deterministic pseudo-embedding for a string or a list of token ids."""
+    digest = hashlib.sha256(json.dumps(item).encode("utf-8")).digest()
+    return [(digest[i % len(digest)] - 128) / 128 for i in range(EMBEDDING_DIM)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.latency)
+
+        if self.path.endswith("/embeddings"):
+            with calls_lock:
+                upstream_calls["embeddings"] += 1
+            inputs = payload["input"] if isinstance(payload["input"], list) else [payload["input"]]
+            self._json({
+                "object": "list",
+                "model": payload.get("model", "stub"),
+                "data": [{"object": "embedding", "index": i, "embedding": fake_vector(x)}
+                         for i, x in enumerate(inputs)],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            })
+        elif self.path.endswith("/chat/completions"):
+            with calls_lock:
+                upstream_calls["chat"] += 1
+            if payload.get("stream"):
+                self._stream_chat(payload)
+            else:
+                self._json({
+                    "id": "stub", "object": "chat.completion", "created": int(time.time()),
+                    "model": payload.get("model", "stub"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": STUB_ANSWER}}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+        else:
+            self.send_error(404)
+
+    def _stream_chat(self, payload: dict):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for word in STUB_ANSWER.split(" "):
+            chunk = {
+                "id": "stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": payload.get("model", "stub"),
+                "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+def start_stub(latency: float) -> ThreadingHTTPServer:
+    handler = type("Handler", (StubHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", free_port()), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def seed_vectorstore(root: str, embeddings_base: str):
+    """Embed the local captions into <root>/<VIDEO_ID> using the stub embeddings."""
+    from langchain_community.embeddings import OpenAIEmbeddings
+    from langchain_community.vectorstores import Chroma
+    from langchain.schema import Document
+    from utils.chunk_index import ChunkIndex
+    from utils.clean_srt import parse_srt
+
+    chunks = parse_srt(SRT_PATH)
+    docs = [Document(page_content=c["text"],
+                     metadata={"timestamp": c["timestamp"], "chapter_title": "Unknown", "position": i})
+            for i, c in enumerate(chunks)]
+    persist_dir = os.path.join(root, VIDEO_ID)
+    Chroma.from_documents(
+        documents=docs,
+        embedding=OpenAIEmbeddings(openai_api_base=embeddings_base, openai_api_key="stub"),
+        persist_directory=persist_dir,
+    )
+    ChunkIndex.from_chunks(chunks).save(persist_dir)
+    print(f"🌱 Seeded {len(docs)} chunks for {VIDEO_ID}")
+
+
+async def wait_for_api(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base_url}/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("API server did not start in time")
+
+
+async def run_load(base_url: str, total: int, concurrency: int, distinct: int, stream: bool) -> list:
+    questions = [f"How do for loops work? (variant {i})" for i in range(distinct)]
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        # Warm-up: opens the vectorstore and caches chapters before timing starts
+        await client.post("/query", json={"video_id": VIDEO_ID, "question": "warm up"})
+
+        async def one(i: int):
+            body = {"video_id": VIDEO_ID, "question": questions[i % distinct], "stream": stream}
+            async with sem:
+                start = time.perf_counter()
+                if stream:
+                    async with client.stream("POST", "/query", json=body) as resp:
+                        resp.raise_for_status()
+                        async for _ in resp.aiter_lines():
+                            pass
+                else:
+                    resp = await client.post("/query", json=body)
+                    resp.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+        health = (await client.get("/health")).json()
+
+    return latencies, elapsed, health
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--distinct", type=int, default=10, help="number of distinct questions")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub upstream latency in seconds")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    stub = start_stub(args.latency)
+    stub_base = f"http://127.0.0.1:{stub.server_address[1]}"
+    api_port = free_port()
+    api_base = f"http://127.0.0.1:{api_port}"
+
+    with tempfile.TemporaryDirectory() as root:
+        seed_vectorstore(root, f"{stub_base}/v1")
+        seeded_calls = upstream_calls["embeddings"]
+
+        env = dict(
+            os.environ,
+            OPENAI_API_KEY="stub",
+            OPENAI_API_BASE=f"{stub_base}/v1",
+            GROQ_API_KEY="stub",
+            GROQ_API_BASE=stub_base,
+            QA_VECTORSTORE_ROOT=root,
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "interfaces.api_server:app",
+             "--port", str(api_port), "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=PROJECT_ROOT, env=env,
+        )
+        try:
+            asyncio.run(wait_for_api(api_base))
+            latencies, elapsed, health = asyncio.run(
+                run_load(api_base, args.requests, args.concurrency, args.distinct, args.stream)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+            stub.shutdown()
+
+    latencies.sort()
+    print(f"\n📈 {args.requests} requests, concurrency {args.concurrency}, "
+          f"{args.distinct} distinct questions, stub latency {args.latency}s")
+    print(f"   throughput: {args.requests / elapsed:.1f} req/s")
+    print(f"   p50: {statistics.median(latencies) * 1000:.0f} ms  "
+          f"p95: {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms  "
+          f"max: {latencies[-1] * 1000:.0f} ms")
+    print(f"   upstream chat calls: {upstream_calls['chat']}  "
+          f"embedding calls: {upstream_calls['embeddings'] - seeded_calls}")
+    print(f"   server stats: {health}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.chapter_insights import (
+    aprecompute_chapter_insights, build_sections, find_insight, load_insights, parse_insight,
+    precompute_chapter_insights
+)
+
+SRT = """1
+00:00:00,000 --> 00:00:04,000
+Welcome to the course
+
+2
+00:01:10,000 --> 00:01:14,000
+Variables store values
+
+3
+00:02:30,000 --> 00:02:34,000
+Loops repeat code
+"""
+
+REPLY = json.dumps({"summary": "Covers a topic.", "key_terms": ["x"], "challenge": "Do a thing."})
+
+
+class FakeLLM:
+    """Stands in for ChatGroq; counts calls and can fail on chosen sections."""
+
+    def __init__(self, fail_on=()):
+        self.calls = 0
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+
+    def invoke(self, prompt):
+        with self.lock:
+            self.calls += 1
+        if any(f'"{title}"' in prompt for title in self.fail_on):
+            raise RuntimeError("rate limited")
+        return SimpleNamespace(content=f"Sure! Here you go:\n{REPLY}")
+
+
+class FakeAsyncLLM:
+    """Async stand-in that records how many calls overlap."""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+
+    async def ainvoke(self, prompt):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return SimpleNamespace(content=REPLY)
+
+
+class TestSections(unittest.TestCase):
+    CHUNKS = [
+        {"timestamp": "00:00:00", "text": "Welcome"},
+        {"timestamp": "00:01:10", "text": "Variables"},
+        {"timestamp": "00:02:30", "text": "Loops"},
+    ]
+
+    def test_sections_follow_chapters(self):
+        chapters = [{"title": "Loops", "seconds": 120}, {"title": "Intro", "seconds": 5}]
+        sections = build_sections(self.CHUNKS, chapters)
+        self.assertEqual([s["title"] for s in sections], ["Intro", "Loops"])
+        self.assertEqual(sections[0]["start"], 0)  # text before the first chapter is kept
+        self.assertEqual(sections[0]["text"], "Welcome Variables")
+        self.assertEqual((sections[1]["start"], sections[1]["end"]), (120, 151))
+
+    def test_time_windows_without_chapters(self):
+        sections = build_sections(self.CHUNKS, [], window_seconds=60)
+        self.assertEqual([s["start"] for s in sections], [0, 60, 120])
+        self.assertEqual(sections[1]["title"], "1:00")
+
+
+class TestParseAndLookup(unittest.TestCase):
+    def test_parse_insight(self):
+        self.assertEqual(parse_insight(f"noise {REPLY} noise")["challenge"], "Do a thing.")
+        self.assertEqual(parse_insight('{"challenge": "c", "key_terms": "a, b"}')["key_terms"], ["a", "b"])
+        self.assertIsNone(parse_insight("no json here"))
+        self.assertIsNone(parse_insight('{"summary": "missing challenge"}'))
+
+    def test_find_insight(self):
+        insights = {"0": {"start": 0, "end": 60}, "120": {"start": 120, "end": 180}}
+        self.assertEqual(find_insight(insights, 30)["start"], 0)
+        self.assertEqual(find_insight(insights, 150)["start"], 120)
+        self.assertIsNone(find_insight(insights, 90))
+        self.assertIsNone(find_insight({}, 10))
+
+
+class TestPrecompute(unittest.TestCase):
+    def test_interrupted_run_resumes(self):
+        chapters = [{"title": "Intro", "seconds": 0}, {"title": "Variables", "seconds": 60},
+                    {"title": "Loops", "seconds": 120}]
+        with tempfile.TemporaryDirectory() as tmp:
+            srt_path = os.path.join(tmp, "abc_captions.srt")
+            with open(srt_path, "w", encoding="utf-8") as f:
+                f.write(SRT)
+            persist_dir = os.path.join(tmp, "store")
+
+            first = FakeLLM(fail_on=("Loops",))
+            precompute_chapter_insights(srt_path, persist_dir, llm=first, chapters=chapters, max_workers=2)
+            self.assertEqual(sorted(load_insights(persist_dir)), ["0", "60"])
+
+            second = FakeLLM()
+            insights = precompute_chapter_insights(srt_path, persist_dir, llm=second, chapters=chapters)
+            self.assertEqual(second.calls, 1)  # only the failed section is retried
+            self.assertEqual(sorted(insights), ["0", "120", "60"])
+            self.assertEqual(insights["120"]["title"], "Loops")
+
+    def test_async_variant_respects_the_callers_limit(self):
+        chapters = [{"title": t, "seconds": s} for t, s in (("Intro", 0), ("Variables", 60), ("Loops", 120))]
+        with tempfile.TemporaryDirectory() as tmp:
+            srt_path = os.path.join(tmp, "abc_captions.srt")
+            with open(srt_path, "w", encoding="utf-8") as f:
+                f.write(SRT)
+            llm = FakeAsyncLLM()
+
+            async def main():
+                return await aprecompute_chapter_insights(
+                    srt_path, os.path.join(tmp, "store"), llm, asyncio.Semaphore(1), chapters
+                )
+
+            insights = asyncio.run(main())
+        self.assertEqual(sorted(insights), ["0", "120", "60"])
+        self.assertEqual(llm.max_active, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.chat_history import compact_sources, extract_code, summarize_message
+
+
+class TestCompactSources(unittest.TestCase):
+    def test_keeps_timestamp_seconds_and_snippet(self):
+        # Simulate source docs from LangChain
+        docs = [SimpleNamespace(page_content="line one\nline two " + "x" * 300,
+                         metadata={"timestamp": "00:02:10", "chapter_title": "Loops"})]
+        compact = compact_sources(docs)
+        self.assertEqual(len(compact), 1)
+        self.assertEqual(compact[0]["timestamp"], "00:02:10")
+        self.assertEqual(compact[0]["seconds"], 130)
+        self.assertEqual(len(compact[0]["snippet"]), 200)
+        self.assertNotIn("\n", compact[0]["snippet"])
+
+    def test_missing_timestamp_defaults_to_start(self):
+        compact = compact_sources([SimpleNamespace(page_content="hi", metadata={})])
+        self.assertEqual(compact[0]["seconds"], 0)
+
+
+class TestMessageHelpers(unittest.TestCase):
+    MESSAGE = "Use a for loop to repeat code.\n\n```python\nfor i in range(3):\n    print(i)\n```"
+
+    def test_extract_code(self):
+        self.assertEqual(extract_code(self.MESSAGE), "for i in range(3):\n    print(i)\n")
+        self.assertIsNone(extract_code("No code here"))
+
+    def test_summary_skips_code_and_truncates(self):
+        self.assertEqual(summarize_message(self.MESSAGE), "Use a for loop to repeat code.")
+        self.assertEqual(summarize_message("```python\nx = 1\n```\nThen print x."), "Then print x.")
+        summary = summarize_message("word " * 100, max_len=20)
+        self.assertTrue(summary.endswith("…"))
+        self.assertLessEqual(len(summary), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
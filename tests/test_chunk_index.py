@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.chunk_index import ChunkIndex
+from utils.clean_srt import parse_srt
+
+
+def make_index():
+    # Ten 3-second cues, back to back: 0-3, 3-6, ..., 27-30
+    chunks = [{"timestamp": f"00:00:{i * 3:02d}", "end_timestamp": f"00:00:{i * 3 + 3:02d}", "text": f"cue{i}"}
+              for i in range(10)]
+    return ChunkIndex.from_chunks(chunks, [f"chapter{i // 5}" for i in range(10)])
+
+
+class TestChunkIndex(unittest.TestCase):
+    def test_built_from_real_captions(self):
+        chunks = parse_srt("data/rfscVS0vtbw_captions.srt")
+        index = ChunkIndex.from_chunks(chunks)
+        self.assertEqual(len(index), len(chunks))
+        self.assertEqual(index.starts, sorted(index.starts))
+        self.assertTrue(all(s <= e for s, e in zip(index.starts, index.ends)))
+
+    def test_locate_by_position_or_timestamp(self):
+        index = make_index()
+        self.assertEqual(index.locate({"position": 4}, "ignored"), 4)
+        self.assertEqual(index.locate({"timestamp": "00:00:09"}, "cue3"), 3)
+        self.assertIsNone(index.locate({"timestamp": "00:00:10"}, "nothing starts here"))
+
+    def test_window_is_time_bounded(self):
+        index = make_index()
+        # cue5 spans 15-18; with 4s of context, cues starting in 11..22 are included
+        self.assertEqual(list(index.window(5, 4)), [4, 5, 6, 7])
+        self.assertEqual(list(index.window(0, 0)), [0, 1])  # cue1 starts exactly at cue0's end
+
+    def test_overlapping_windows_merge_in_rank_order(self):
+        index = make_index()
+        spans = index.expand([8, 2, 3], window_seconds=3)
+        self.assertEqual(len(spans), 2)
+        # Best hit (rank 0) was cue8, so its span comes first
+        self.assertEqual(spans[0]["metadata"]["hit_position"], 8)
+        self.assertEqual(spans[0]["text"], "cue7 cue8 cue9")
+        self.assertEqual((spans[1]["metadata"]["position_start"], spans[1]["metadata"]["position_end"]), (1, 5))
+        # Timestamp is the best hit's (cue2), the span itself starts at cue1
+        self.assertEqual(spans[1]["metadata"]["timestamp"], "00:00:06")
+        self.assertEqual(spans[1]["metadata"]["start_seconds"], 3)
+        self.assertEqual(spans[1]["metadata"]["chapter_title"], "chapter0")
+
+    def test_save_and_load(self):
+        index = make_index()
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertIsNone(ChunkIndex.load(tmp))
+            index.save(tmp)
+            loaded = ChunkIndex.load(tmp)
+        self.assertEqual(loaded.texts, index.texts)
+        self.assertEqual(loaded.ends, index.ends)
+
+
+if __name__ == '__main__':
+    unittest.main()
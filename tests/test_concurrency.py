@@ -0,0 +1,79 @@
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.concurrency import InFlightCoalescer, bounded_semaphores
+
+
+class TestInFlightCoalescer(unittest.TestCase):
+    def test_identical_requests_share_one_call(self):
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        async def main():
+            coalescer = InFlightCoalescer()
+            results = await asyncio.gather(*(coalescer.run("q", work) for _ in range(5)))
+            return coalescer, results
+
+        coalescer, results = asyncio.run(main())
+        self.assertEqual(results, ["answer"] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(coalescer.hits, 4)
+        self.assertEqual(len(coalescer), 0)
+
+    def test_different_keys_run_separately(self):
+        async def main():
+            coalescer = InFlightCoalescer()
+            return await asyncio.gather(
+                coalescer.run("a", lambda: asyncio.sleep(0, result="a")),
+                coalescer.run("b", lambda: asyncio.sleep(0, result="b")),
+            )
+
+        self.assertEqual(asyncio.run(main()), ["a", "b"])
+
+    def test_finished_key_is_not_cached(self):
+        calls = []
+
+        async def work():
+            calls.append(1)
+            return len(calls)
+
+        async def main():
+            coalescer = InFlightCoalescer()
+            first = await coalescer.run("q", work)
+            second = await coalescer.run("q", work)
+            return first, second
+
+        self.assertEqual(asyncio.run(main()), (1, 2))
+
+    def test_errors_propagate_to_all_waiters(self):
+        async def boom():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        async def main():
+            coalescer = InFlightCoalescer()
+            return await asyncio.gather(
+                coalescer.run("q", boom), coalescer.run("q", boom), return_exceptions=True
+            )
+
+        results = asyncio.run(main())
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+
+
+class TestBoundedSemaphores(unittest.TestCase):
+    def test_limits_are_at_least_one(self):
+        sems = bounded_semaphores({"llm": 0, "embeddings": 3})
+        self.assertEqual(sems["llm"]._value, 1)
+        self.assertEqual(sems["embeddings"]._value, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.storage_manager import StorageManager
+
+
+class TestStorageManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "vectorstore", "youtube")
+        self.data = os.path.join(self.tmp.name, "data")
+        os.makedirs(self.data)
+        self.manager = StorageManager(self.root, self.data, budget_bytes=2500)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def add_video(self, video_id: str, size: int = 1000):
+        persist_dir = os.path.join(self.root, video_id)
+        os.makedirs(persist_dir)
+        with open(os.path.join(persist_dir, "data.bin"), "wb") as f:
+            f.write(b"x" * size)
+        with open(os.path.join(self.data, f"{video_id}_captions.srt"), "w") as f:
+            f.write("1\n00:00:00,000 --> 00:00:01,000\nhi\n")
+
+    def test_status_reports_footprint_and_hits(self):
+        self.add_video("a")
+        self.manager.touch("a")
+        self.manager.touch("a")
+        [row] = self.manager.status()
+        self.assertEqual(row["video_id"], "a")
+        self.assertGreater(row["bytes"], 1000)  # store + captions
+        self.assertEqual(row["hits"], 2)
+        self.assertEqual(row["active_leases"], 0)
+
+    def test_budget_evicts_least_recently_used(self):
+        for video_id in ("old", "mid", "new"):
+            self.add_video(video_id)
+            self.manager.touch(video_id)
+            time.sleep(0.01)
+        self.manager.touch("old")  # now "mid" is the least recently used
+
+        evicted = self.manager.enforce_budget()
+        self.assertEqual(evicted, ["mid"])
+        self.assertEqual(self.manager.video_ids(), ["new", "old"])
+        self.assertFalse(os.path.exists(os.path.join(self.data, "mid_captions.srt")))
+
+    def test_leased_and_protected_videos_are_never_evicted(self):
+        for video_id in ("a", "b", "c"):
+            self.add_video(video_id)
+        with self.manager.lease("a"):
+            evicted = self.manager.enforce_budget(protect={"b"})
+            self.assertEqual(evicted, ["c"])
+            self.assertFalse(self.manager.evict("a"))
+        self.assertTrue(self.manager.evict("a"))
+        self.assertEqual(self.manager.video_ids(), ["b"])
+
+    def test_own_lease_can_be_ignored_and_expired_leases_pruned(self):
+        self.add_video("a")
+        mine = self.manager.acquire("a")
+        self.manager.acquire("a", ttl=-1)  # already expired
+        self.assertEqual(self.manager.status()[0]["active_leases"], 1)
+        self.manager.prune_leases()
+        self.assertEqual(os.listdir(os.path.join(self.root, ".leases", "a")), [mine])
+        self.assertTrue(self.manager.evict("a", ignore_lease=mine))
+        # The caller's own lease survives, e.g. to protect a re-ingest
+        self.assertTrue(os.path.exists(os.path.join(self.root, ".leases", "a", mine)))
+
+    def test_unknown_or_unsafe_ids_are_rejected(self):
+        self.add_video("a")
+        leased = self.manager.acquire("a")
+        for bad in (".leases", "..", "../youtube", ""):
+            with self.assertRaises(ValueError):
+                self.manager.acquire(bad)
+        for missing in (".leases", "..", "nope"):
+            with self.assertRaises(FileNotFoundError):
+                self.manager.evict(missing)
+        self.assertEqual(self.manager.video_ids(), ["a"])
+        self.assertIn(leased, os.listdir(os.path.join(self.root, ".leases", "a")))
+        self.assertTrue(os.path.exists(os.path.join(self.root, ".storage.lock")))
+
+    def test_store_being_ingested_is_not_evicted(self):
+        self.add_video("a")
+        self.manager.touch("a")
+        with self.manager.lease("b"):
+            self.add_video("b", size=2000)  # half-written, no registry entry yet
+            self.assertEqual(self.manager.enforce_budget(protect={"a"}), [])
+        self.assertEqual(self.manager.video_ids(), ["a", "b"])
+
+    def test_on_evict_callbacks(self):
+        self.add_video("a")
+        seen = []
+        self.manager.on_evict.append(seen.append)
+        self.manager.evict("a")
+        self.assertEqual(seen, ["a"])
+
+    def test_compact_vacuums_idle_stores_only(self):
+        self.add_video("a")
+        db_path = os.path.join(self.root, "a", "chroma.sqlite3")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE t (x BLOB)")
+        conn.executemany("INSERT INTO t VALUES (?)", [(b"y" * 4096,)] * 200)
+        conn.commit()
+        conn.execute("DELETE FROM t")
+        conn.commit()
+        conn.close()
+        open(os.path.join(self.root, "a", "leftover.tmp"), "w").close()
+        before = os.path.getsize(db_path)
+
+        with self.manager.lease("a"):
+            self.assertFalse(self.manager.compact("a"))
+        self.assertTrue(self.manager.compact("a"))
+        self.assertLess(os.path.getsize(db_path), before)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "a", "leftover.tmp")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+# utils/chat_history.py
+import re
+from typing import Dict, List, Optional
+
+from utils.time import timestamp_to_seconds
+
+CODE_BLOCK = re.compile(r"```(?:python)?\n(.*?)```", re.DOTALL)
+
+
+def compact_sources(docs: List, snippet_len: int = 200) -> List[Dict]:
+    """Keep only what the UI shows for each source: timestamp, seconds and a short snippet."""
+    compact = []
+    for doc in docs:
+        ts = doc.metadata.get("timestamp", "00:00:00")
+        compact.append({
+            "timestamp": ts,
+            "seconds": timestamp_to_seconds(ts),
+            "snippet": doc.page_content[:snippet_len].replace("\n", " "),
+        })
+    return compact
+
+
+def extract_code(message: str) -> Optional[str]:
+    """Return the first fenced code block in a message, if any."""
+    match = CODE_BLOCK.search(message)
+    return match.group(1) if match else None
+
+
+def summarize_message(message: str, max_len: int = 120) -> str:
+    """One-line preview of an answer: its first line of prose, truncated."""
+    prose = CODE_BLOCK.sub(" ", message)
+    first_line = next((line.strip() for line in prose.splitlines() if line.strip()), "")
+    if len(first_line) > max_len:
+        return first_line[:max_len - 1].rstrip() + "…"
+    return first_line
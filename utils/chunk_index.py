@@ -0,0 +1,120 @@
+# utils/chunk_index.py
+import json
+import os
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional
+
+from utils.time import timestamp_to_seconds
+
+CHUNK_INDEX_FILE = "chunk_index.json"
+
+
+class ChunkIndex:
+    """Time-ordered array of a video's transcript chunks.
+
+    Built once at ingest and stored next to the vectorstore. Position i in
+    every list is the i-th caption chunk, so a retrieved chunk's neighbours
+    are just a slice of the arrays: no extra embeddings or vector queries.
+    """
+
+    def __init__(self, starts: List[int], ends: List[int], timestamps: List[str],
+                 texts: List[str], chapters: List[str]):
+        self.starts = starts
+        self.ends = ends
+        self.timestamps = timestamps
+        self.texts = texts
+        self.chapters = chapters
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @classmethod
+    def from_chunks(cls, chunks: List[Dict], chapter_titles: Optional[List[str]] = None) -> "ChunkIndex":
+        """Build from parse_srt output (already in caption order)."""
+        starts, ends = [], []
+        for chunk in chunks:
+            start = timestamp_to_seconds(chunk["timestamp"])
+            end = timestamp_to_seconds(chunk.get("end_timestamp", chunk["timestamp"]))
+            starts.append(start)
+            ends.append(max(start, end))
+        return cls(
+            starts=starts,
+            ends=ends,
+            timestamps=[c["timestamp"] for c in chunks],
+            texts=[c["text"] for c in chunks],
+            chapters=chapter_titles or ["Unknown"] * len(chunks),
+        )
+
+    def save(self, persist_dir: str):
+        os.makedirs(persist_dir, exist_ok=True)
+        with open(os.path.join(persist_dir, CHUNK_INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump(self.__dict__, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, persist_dir: str) -> Optional["ChunkIndex"]:
+        """Return the stored index, or None for videos embedded before it existed."""
+        path = os.path.join(persist_dir, CHUNK_INDEX_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+    def locate(self, metadata: Dict, text: str) -> Optional[int]:
+        """Position of a retrieved chunk: from its metadata, else by timestamp and text."""
+        position = metadata.get("position")
+        if position is not None and 0 <= int(position) < len(self):
+            return int(position)
+
+        seconds = timestamp_to_seconds(metadata.get("timestamp", "00:00:00"))
+        i = bisect_left(self.starts, seconds)
+        j = bisect_right(self.starts, seconds)
+        for p in range(i, j):
+            if self.texts[p] == text:
+                return p
+        return i if i < j else None
+
+    def window(self, position: int, window_seconds: int) -> range:
+        """Positions of the chunks starting within window_seconds of the chunk at `position`."""
+        lo = bisect_left(self.starts, self.starts[position] - window_seconds)
+        hi = bisect_right(self.starts, self.ends[position] + window_seconds)
+        return range(lo, hi)
+
+    def expand(self, positions: List[int], window_seconds: int) -> List[Dict]:
+        """Expand each hit to its time window and merge overlapping windows.
+
+        Spans keep the order of their best-ranked hit, so the retriever's
+        ranking (and therefore the "top source") is preserved.
+        """
+        spans = []  # [lo, hi, best_rank, hit_position]
+        for rank, position in enumerate(positions):
+            r = self.window(position, window_seconds)
+            spans.append([r.start, r.stop, rank, position])
+
+        merged = []
+        for span in sorted(spans):
+            if merged and span[0] <= merged[-1][1]:
+                last = merged[-1]
+                last[1] = max(last[1], span[1])
+                if span[2] < last[2]:
+                    last[2], last[3] = span[2], span[3]
+            else:
+                merged.append(span)
+
+        merged.sort(key=lambda s: s[2])
+        return [self.span(lo, hi, hit) for lo, hi, _, hit in merged]
+
+    def span(self, lo: int, hi: int, hit: int) -> Dict:
+        # "timestamp" stays the hit's own cue: it drives the player jump and the
+        # chapter-insight lookup; start_seconds/position_start give the span start
+        return {
+            "text": " ".join(self.texts[lo:hi]),
+            "metadata": {
+                "timestamp": self.timestamps[hit],
+                "chapter_title": self.chapters[hit],
+                "start_seconds": self.starts[lo],
+                "end_seconds": self.ends[hi - 1],
+                "position_start": lo,
+                "position_end": hi - 1,
+                "hit_position": hit,
+            },
+        }
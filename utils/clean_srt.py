@@ -21,10 +21,13 @@ def parse_srt(srt_path: str) -> List[Dict[str, str]]:
         # Extract just the start time (e.g., "00:01:05,900" -> "00:01:05")
         match = re.match(r"(\d{2}:\d{2}:\d{2})", timestamp)
         start_time = match.group(1) if match else "00:00:00"
+        end_match = re.search(r"-->\s*(\d{2}:\d{2}:\d{2})", timestamp)
+        end_time = end_match.group(1) if end_match else start_time
 
         results.append({
             "text": text,
-            "timestamp": start_time
+            "timestamp": start_time,
+            "end_timestamp": end_time
         })
 
     return results
@@ -0,0 +1,35 @@
+# utils/concurrency.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class InFlightCoalescer:
+    """Share one running task between identical concurrent requests.
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same task instead of starting their own. The key
+    is forgotten as soon as the task finishes, so results are never cached.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.hits += 1
+        # shield() so one cancelled caller doesn't cancel the work for everyone else
+        return await asyncio.shield(task)
+
+
+def bounded_semaphores(limits: Dict[str, int]) -> Dict[str, asyncio.Semaphore]:
+    """Create one semaphore per upstream name, e.g. {"llm": 8, "embeddings": 16}."""
+    return {name: asyncio.Semaphore(max(1, limit)) for name, limit in limits.items()}